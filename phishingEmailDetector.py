@@ -1,115 +1,325 @@
 import re
 import math
-from collections import defaultdict
-from typing import List, Dict, Tuple
+import argparse
+import hashlib
+import io
+import os
+import pickle
+import sys
+from collections import OrderedDict, defaultdict
+from itertools import compress, repeat
+from operator import is_
+from typing import List, Dict, Optional, Sequence, Tuple
 import json
 
 
+# Regex patterns are compiled once at import instead of on every call
+_URL_RE = re.compile(r'http[s]?://\S+')
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+_GENERIC_GREET_RE = re.compile(r'dear (customer|user|member)')
+# Sketchy domains (free domains and link shorteners scammers love)
+_SUSPICIOUS_DOMAIN_RE = re.compile(r'\.(?:tk|ml|ga)\b|bit\.ly|tinyurl')
+
+# Red-flag keyword tables for extract_features(), built once at import
+URGENCY_WORDS = ('urgent', 'immediate', 'act now', 'expire', 'suspended',
+                 'verify', 'confirm', 'update', 'security alert')
+PERSONAL_INFO = ('password', 'ssn', 'social security', 'credit card',
+                 'account number', 'pin', 'banking')
+MISSPELLINGS = ('recieve', 'seperate', 'occured', 'privilage')
+
+# How much each kind of red flag (the categories _red_flags() reports)
+# counts towards the heuristic score. A detector built with a
+# hard_threshold, e.g. HARD_THRESHOLD, calls an email phishing right away
+# once it scores that much, and skips the Markov scoring.
+RED_FLAG_WEIGHTS = {
+    "urgency": 1,
+    "multiple_urls": 1,
+    "suspicious_domain": 3,
+    "sensitive_info": 3,
+    "generic_greeting": 1,
+    "typo": 1,
+}
+HARD_THRESHOLD = 8
+
+# Score for a word a brain has never seen at all (tiny penalty)
+_UNSEEN_LOG_PROB = math.log(1e-10)
+
+# "Stupid backoff": an unseen pattern falls back to the same next word after
+# a shorter state, paying this discount (log 0.4) for each word dropped
+_BACKOFF_LOG_DISCOUNT = math.log(0.4)
+
+# All preprocessing replacements in ONE pass: URL | email | money | number.
+# Whichever group matched tells us which tag to put in its place.
+_PREPROC_RE = re.compile(
+    r'(http[s]?://\S+)'
+    r'|(\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    r'|(\$\d+(?:\.\d+)?)'
+    r'|(\b\d+\b)'
+)
+_PREPROC_TAGS = ('<URL>', '<EMAIL>', '<MONEY>', '<NUMBER>')
+
+
+def _preproc_repl(match: re.Match) -> str:
+    """Pick the tag for whichever _PREPROC_RE group matched."""
+    return _PREPROC_TAGS[match.lastindex - 1]
+
+
+def _backoff(state: Tuple, next_token: int, logp: Dict) -> float:
+    """
+    Score a pattern the brain never saw by trying shorter and shorter states:
+    ("click", "here") → "now" unseen? Try ("here",) → "now", then just "now".
+    """
+    discount = 0.0
+    for k in range(1, len(state) + 1):
+        discount += _BACKOFF_LOG_DISCOUNT
+        lp = logp.get((state[k:], next_token))
+        if lp is not None:
+            return lp + discount
+    # NEVER seen this word at all = very suspicious
+    return _UNSEEN_LOG_PROB
+
+
+def _digest(email: str) -> bytes:
+    """
+    Short fingerprint of an email for the result caches, so they don't
+    hold on to whole emails.
+    """
+    return hashlib.blake2b(email.encode('utf-8', 'surrogatepass'),
+                           digest_size=16).digest()
+
+
+def _copy_result(result: Dict) -> Dict:
+    """Copy a cached detect() result so callers can't change the cached one."""
+    return dict(result, suspicious_features=list(result["suspicious_features"]))
+
+
+def _red_flag_score(flags: List[Tuple[str, str]]) -> int:
+    """Add up RED_FLAG_WEIGHTS for the (category, message) flags found."""
+    return sum(RED_FLAG_WEIGHTS[category] for category, _ in flags)
+
+
+def _score(pairs: List[Tuple], logp: Dict) -> float:
+    """
+    The scoring kernel: add up the log-probability of every pattern.
+    
+    Seen before? Add how common it is (already a log, see _finalize).
+    Otherwise back off to a shorter version of the pattern instead.
+    
+    The seen patterns are looked up and summed by map/sum/filter in C. Only
+    the misses (picked out with compress, also in C) go through the Python
+    backoff. filter(None, ...) drops the misses' None, and also any 0.0,
+    which adds nothing anyway.
+    """
+    lps = list(map(logp.get, pairs))
+    log_prob = sum(filter(None, lps))
+    for state, next_token in compress(pairs, map(is_, lps, repeat(None))):
+        log_prob += _backoff(state, next_token, logp)
+    return log_prob
+
+
 class MarkovEmailDetector:
     """
     A Markov Chain-based email classifier that detects phishing attempts
     by learning language patterns from legitimate and phishing emails.
     """
     
-    def __init__(self, order: int = 2):
+    def __init__(self, order: int = 2, cache_size: int = 256,
+                 hard_threshold: Optional[int] = None):
         """
         Initialize the email detector.
         
         Args:
             order: The order of the Markov chain (n-gram size)
+            cache_size: How many recent detect() results to remember
+                (0 turns the cache off)
+            hard_threshold: Red-flag score (see RED_FLAG_WEIGHTS) at which
+                detect() skips the Markov chains and says PHISHING.
+                Off (None) by default: the keyword checks are only a backup
+                and can misfire, e.g. 'pin' inside "shipping".
         """
+        if order < 0:
+            raise ValueError(f"order must be 0 or more, got {order}")
         self.order = order
+        self._hard_threshold = hard_threshold
+        
+        # Every word we've trained on gets a small int id, so chain states are
+        # tuples of ints (cheap to hash and compare) instead of tuples of strings
+        self._vocab = {}
         
         # TWO SEPARATE BRAINS: one learns "normal emails", one learns "scam emails"
         # Each brain remembers: "after seeing words X and Y, what word usually comes next?"
-        self.legitimate_chain = defaultdict(lambda: defaultdict(int))
-        self.phishing_chain = defaultdict(lambda: defaultdict(int))
+        # Stored flat as {(state, next_token): count} so one lookup answers it
+        self.legitimate_chain = defaultdict(int)
+        self.phishing_chain = defaultdict(int)
+        
+        # Running total of how many times each state was seen, kept in step with
+        # the chains so scoring never has to re-add a state's successor counts
+        self.legit_totals = defaultdict(int)
+        self.phishing_totals = defaultdict(int)
+        
+        # Precomputed log(count / total) for every (state, next_token) pattern,
+        # rebuilt by _finalize() after training
+        self.legit_logp = {}
+        self.phishing_logp = {}
         
         # Keep count of how many emails we've seen
         self.legitimate_count = 0
         self.phishing_count = 0
         self.trained = False
         
+        # Recently checked emails → their results, oldest first, so pasting
+        # the same email again is just a lookup
+        self.cache_size = cache_size
+        self._detect_cache = OrderedDict()
+        
+    @property
+    def hard_threshold(self) -> Optional[int]:
+        """Red-flag score that skips the Markov chains (None = never skip)."""
+        return self._hard_threshold
+    
+    @hard_threshold.setter
+    def hard_threshold(self, value: Optional[int]):
+        # Cached results were decided under the old threshold
+        self._hard_threshold = value
+        self._detect_cache.clear()
+    
     def preprocess_email(self, text: str) -> str:
         """
         Clean up the email so we focus on patterns, not specific details.
         Example: "Visit http://evil.com" becomes "Visit <URL>"
         """
-        text = text.lower()
-        
-        # Replace all URLs with <URL> tag (so we look for "click <URL>" pattern, not the specific URL)
-        text = re.sub(r'http[s]?://\S+', '<URL>', text)
-        
-        # Replace all emails with <EMAIL> tag
-        text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '<EMAIL>', text)
-        
-        # Replace money amounts like "$500" with <MONEY>
-        text = re.sub(r'\$\d+(?:\.\d+)?', '<MONEY>', text)
-        
-        # Replace all numbers with <NUMBER>
-        text = re.sub(r'\b\d+\b', '<NUMBER>', text)
-        
-        return text
+        return self._preprocess_lower(text.lower())
+    
+    def _preprocess_lower(self, lower: str) -> str:
+        """
+        preprocess_email() for text that is already lowercased. Training and
+        detect() both end up here, so they always clean emails the same way.
+        """
+        # One scan replaces URLs with <URL> (so we look for "click <URL>" pattern,
+        # not the specific URL), emails with <EMAIL>, money like "$500" with
+        # <MONEY> and any other number with <NUMBER>
+        return _PREPROC_RE.sub(_preproc_repl, lower)
+    
+    def _prepare(self, email: str) -> Tuple[str, List[str]]:
+        """
+        Do the shared prep work for detect() once: lowercase the email and
+        pull out its URLs, so neither the heuristics in extract_features nor
+        the preprocessing for the chains has to repeat it.
+        """
+        lower = email.lower()
+        return lower, _URL_RE.findall(lower)
     
     def tokenize(self, text: str) -> List[str]:
         """
         Break text into pieces (words and punctuation).
         "Hello, world!" becomes ["hello", ",", "world", "!"]
         """
-        tokens = re.findall(r'\w+|[^\w\s]', text)
-        return tokens
+        return _TOKEN_RE.findall(text)
     
-    def build_chain(self, tokens: List[str], chain: Dict):
+    def _ids(self, tokens: List[str], add: bool = False) -> List[int]:
+        """
+        Swap each token for its vocabulary id.
+        
+        Training (add=True) hands out new ids for new words. Detection
+        maps words we've never trained on to -1, which can't match any
+        learned pattern, so it gets the unseen penalty straight away.
+        """
+        vocab = self._vocab
+        if add:
+            return [vocab.setdefault(token, len(vocab)) for token in tokens]
+        return [vocab.get(token, -1) for token in tokens]
+    
+    def build_chain(self, tokens: Sequence[int], chain: Dict, totals: Dict):
         """
         Build the Markov chain by counting word patterns.
         
         How it works:
         - Look at every pair of words (if order=2)
         - Count what word comes after that pair
+        - Bump that pair's running total in `totals` at the same time
+        - Do the same for every shorter state ending there, down to the
+          empty state (plain word counts), so scoring can back off
         
         Example with "I am happy. I am sad":
         State ("i", "am") → "happy" appears 1 time
         State ("i", "am") → "sad" appears 1 time
+        (the words are stored as their ids from _ids)
         """
-        for i in range(len(tokens) - self.order):
-            # Get the current "state" (pair of words if order=2)
-            state = tuple(tokens[i:i + self.order])
-            
-            # Get the next word after this state
-            next_token = tokens[i + self.order]
-            
+        # Each pair is (current "state" = pair of words if order=2, next word)
+        for state, next_token in self._pairs(tokens):
             # Count it! (this is the "learning" part)
-            chain[state][next_token] += 1
+            for k in range(len(state) + 1):
+                shorter = state[k:]
+                chain[(shorter, next_token)] += 1
+                totals[shorter] += 1
     
-    def train_legitimate(self, emails: List[str]):
+    def train_legitimate(self, emails: List[str], verbose: bool = False):
         """
         Teach the detector what NORMAL emails look like.
+        Pass verbose=True to print a short training summary.
         """
         for email in emails:
             processed = self.preprocess_email(email)
-            tokens = self.tokenize(processed)
+            tokens = self._ids(self.tokenize(processed), add=True)
             # Feed patterns into the "good email" brain
-            self.build_chain(tokens, self.legitimate_chain)
+            self.build_chain(tokens, self.legitimate_chain, self.legit_totals)
             self.legitimate_count += 1
         
-        print(f"Trained on {self.legitimate_count} legitimate emails")
-        print(f"  Unique patterns: {len(self.legitimate_chain)}")
+        if verbose:
+            print(f"Trained on {self.legitimate_count} legitimate emails")
+            print(f"  Unique patterns: {self._pattern_count(self.legit_totals)}")
+        self._finalize()
     
-    def train_phishing(self, emails: List[str]):
+    def train_phishing(self, emails: List[str], verbose: bool = False):
         """
         Teach the detector what SCAM emails look like.
+        Pass verbose=True to print a short training summary.
         """
         for email in emails:
             processed = self.preprocess_email(email)
-            tokens = self.tokenize(processed)
+            tokens = self._ids(self.tokenize(processed), add=True)
             # Feed patterns into the "scam email" brain
-            self.build_chain(tokens, self.phishing_chain)
+            self.build_chain(tokens, self.phishing_chain, self.phishing_totals)
             self.phishing_count += 1
         
-        print(f"Trained on {self.phishing_count} phishing emails")
-        print(f"  Unique patterns: {len(self.phishing_chain)}")
+        if verbose:
+            print(f"Trained on {self.phishing_count} phishing emails")
+            print(f"  Unique patterns: {self._pattern_count(self.phishing_totals)}")
+        self._finalize()
         self.trained = True
     
+    def _finalize(self):
+        """
+        Turn the raw counts into log-probabilities once, so detection only
+        has to look numbers up instead of dividing and taking logs per word.
+        """
+        # Anything cached was scored by the old model
+        self._detect_cache.clear()
+        self.legit_logp = {
+            pair: math.log(count / self.legit_totals[pair[0]])
+            for pair, count in self.legitimate_chain.items()
+        }
+        self.phishing_logp = {
+            pair: math.log(count / self.phishing_totals[pair[0]])
+            for pair, count in self.phishing_chain.items()
+        }
+    
+    def _pairs(self, tokens: Sequence[int]) -> List[Tuple]:
+        """
+        Every word pattern in the email, as (state, next_token) keys.
+        
+        Zipping shifted views of the tokens slides the state window along
+        one word at a time, so no per-position slice + tuple() is needed.
+        """
+        order = self.order
+        if order == 0:
+            # No context at all: every token follows the empty state
+            # (zip() of no iterables would yield nothing)
+            states = repeat((), len(tokens))
+        else:
+            states = zip(*(tokens[k:] for k in range(order)))
+        return list(zip(states, tokens[order:]))
+    
     def calculate_log_probability(self, tokens: List[str], chain: Dict) -> float:
         """
         Calculate how "likely" this email is according to one of our brains.
@@ -117,28 +327,23 @@ class MarkovEmailDetector:
         Think of it like: "Does this email sound like the emails you trained me on?"
         Higher score = more similar
         Lower score = less similar
+        
+        `chain` picks the brain: pass legitimate_chain or phishing_chain (the
+        matching legit_logp / phishing_logp table works too). Scoring always
+        uses that brain's log-prob table.
         """
+        if chain is self.legitimate_chain or chain is self.legit_logp:
+            logp = self.legit_logp
+        elif chain is self.phishing_chain or chain is self.phishing_logp:
+            logp = self.phishing_logp
+        else:
+            raise ValueError("chain must be one of this detector's chains "
+                             "(legitimate_chain or phishing_chain)")
+        
         if len(tokens) < self.order + 1:
             return float('-inf')  # Not enough data
         
-        log_prob = 0.0  # Start with 0 score
-        
-        # Look at every word pattern in the email
-        for i in range(len(tokens) - self.order):
-            state = tuple(tokens[i:i + self.order])
-            next_token = tokens[i + self.order]
-            
-            # Check: "Have I seen this pattern before?"
-            if state in chain and next_token in chain[state]:
-                # YES! Calculate how common this pattern is
-                total = sum(chain[state].values())  # How many times did we see this state?
-                prob = chain[state][next_token] / total  # What % of time did this word follow?
-                log_prob += math.log(prob)  # Add to score (using log for math reasons)
-            else:
-                # NEVER seen this pattern = very suspicious
-                log_prob += math.log(1e-10)  # Tiny penalty
-        
-        return log_prob
+        return _score(self._pairs(self._ids(tokens)), logp)
     
     def detect(self, email: str) -> Dict:
         """
@@ -152,36 +357,98 @@ class MarkovEmailDetector:
         if not self.trained:
             return {"error": "Model not trained"}
         
-        # Clean up the email
-        processed = self.preprocess_email(email)
-        tokens = self.tokenize(processed)
+        # Seen this exact email recently? Skip straight to the answer.
+        key = _digest(email)
+        cache = self._detect_cache
+        result = cache.get(key)
+        if result is None:
+            result = self._detect_uncached(email)
+            if self.cache_size > 0:
+                cache[key] = result
+                if len(cache) > self.cache_size:
+                    cache.popitem(last=False)  # Forget the oldest one
+        else:
+            cache.move_to_end(key)
         
-        # STEP 1: Ask the "normal email" brain for a score
-        legit_score = self.calculate_log_probability(tokens, self.legitimate_chain)
+        # Hand out a copy so callers can't change what's cached
+        return _copy_result(result)
+    
+    def detect_batch(self, emails: List[str]) -> List[Dict]:
+        """
+        Run detect() on a whole list of emails (e.g. an inbox scan).
         
-        # STEP 2: Ask the "scam email" brain for a score
-        phishing_score = self.calculate_log_probability(tokens, self.phishing_chain)
+        Results come back in the same order. Every distinct email in the
+        batch is scored exactly once, however far apart its copies are.
+        The batch keeps its own lookup table and doesn't touch detect()'s
+        recent-results cache, so a big scan can't push those out.
+        """
+        if not self.trained:
+            return [{"error": "Model not trained"} for _ in emails]
+        
+        seen = {}
+        results = []
+        for email in emails:
+            key = _digest(email)
+            result = seen.get(key)
+            if result is None:
+                result = seen[key] = self._detect_uncached(email)
+            results.append(_copy_result(result))
+        return results
+    
+    def _detect_uncached(self, email: str) -> Dict:
+        """detect() without the result cache."""
+        text_lower, urls = self._prepare(email)
+        
+        # STEP 0: Check for obvious red flags first, it's the cheap part.
+        # With a hard_threshold set, enough of them (say a .tk link AND a
+        # request for your SSN) means there's no need to ask the brains.
+        flags = self._red_flags(text_lower, urls)
+        features = [message for _, message in flags]
+        if (self.hard_threshold is not None
+                and _red_flag_score(flags) >= self.hard_threshold):
+            return {
+                "is_phishing": True,
+                "confidence": 99.0,
+                "legitimate_score": None,  # Not computed
+                "phishing_score": None,
+                "suspicious_features": features,
+                "verdict": "PHISHING"
+            }
+        
+        # Clean up the email
+        processed = self._preprocess_lower(text_lower)
+        tokens = self._ids(self.tokenize(processed))
+        
+        # Both brains score the same patterns, so build the keys only once
+        pairs = self._pairs(tokens)
+        if pairs:
+            # STEP 1: Ask the "normal email" brain for a score
+            legit_score = _score(pairs, self.legit_logp)
+            
+            # STEP 2: Ask the "scam email" brain for a score
+            phishing_score = _score(pairs, self.phishing_logp)
+        else:
+            legit_score = phishing_score = float('-inf')  # Not enough data
         
         # STEP 3: Compare the scores and decide
-        if legit_score == float('-inf') and phishing_score == float('-inf'):
-            # Email is totally unlike anything we've seen
+        diff = phishing_score - legit_score
+        if math.isnan(diff):
+            # Both scores are -inf: email is totally unlike anything we've seen
             confidence = 0.5
             is_phishing = False
         else:
             # Convert scores to percentages using softmax math
-            # This turns two scores into "X% chance of phishing"
-            max_score = max(legit_score, phishing_score)
-            legit_exp = math.exp(legit_score - max_score)
-            phishing_exp = math.exp(phishing_score - max_score)
-            total = legit_exp + phishing_exp
-            
-            phishing_prob = phishing_exp / total  # % chance of being phishing
-            confidence = phishing_prob
+            # With two classes softmax is just a sigmoid of the score gap,
+            # which turns two scores into "X% chance of phishing".
+            # exp() only ever sees a value <= 0, so it cannot overflow.
+            if diff >= 0:
+                phishing_prob = 1.0 / (1.0 + math.exp(-diff))
+            else:
+                gap_exp = math.exp(diff)
+                phishing_prob = gap_exp / (1.0 + gap_exp)
+            confidence = phishing_prob  # % chance of being phishing
             is_phishing = phishing_score > legit_score  # Whichever score is higher wins
         
-        # STEP 4: Also check for obvious red flags (bonus detection)
-        features = self.extract_features(email)
-        
         return {
             "is_phishing": is_phishing,
             "confidence": confidence * 100,
@@ -200,57 +467,104 @@ class MarkovEmailDetector:
         ☑ Has sketchy .tk domain? → Common scam domain
         ☑ Asks for password? → RED FLAG
         """
-        features = []
         text_lower = email.lower()
+        flags = self._red_flags(text_lower, _URL_RE.findall(text_lower))
+        return [message for _, message in flags]
+    
+    def _red_flags(self, text_lower: str, urls: List[str]) -> List[Tuple[str, str]]:
+        """
+        extract_features() for an already-lowercased email whose URLs have
+        already been found (detect() gets both from _prepare). Each flag
+        comes back as (category, message); the category is what
+        RED_FLAG_WEIGHTS is keyed on.
+        """
+        flags = []
         
         # TACTIC 1: Urgency words (scammers want you to panic and click fast)
-        urgency_words = ['urgent', 'immediate', 'act now', 'expire', 'suspended', 
-                        'verify', 'confirm', 'update', 'security alert']
-        
-        for word in urgency_words:
-            if word in text_lower:
-                features.append(f"Urgency keyword: '{word}'")
+        flags.extend(("urgency", f"Urgency keyword: '{word}'")
+                     for word in URGENCY_WORDS if word in text_lower)
         
         # TACTIC 2: Too many links (suspicious)
-        urls = re.findall(r'http[s]?://\S+', email)
         if len(urls) > 2:
-            features.append(f"Multiple URLs ({len(urls)})")
+            flags.append(("multiple_urls", f"Multiple URLs ({len(urls)})"))
         
         # TACTIC 3: Sketchy domains (free domains scammers love)
-        suspicious_domains = ['.tk', '.ml', '.ga', 'bit.ly', 'tinyurl']
+        # (each domain counts at most once per URL)
         for url in urls:
-            for domain in suspicious_domains:
-                if domain in url:
-                    features.append(f"Suspicious domain: {domain}")
+            hits = dict.fromkeys(m.group() for m in _SUSPICIOUS_DOMAIN_RE.finditer(url))
+            flags.extend(("suspicious_domain", f"Suspicious domain: {hit}")
+                         for hit in hits)
         
         # TACTIC 4: Asking for sensitive info (HUGE red flag)
-        personal_info = ['password', 'ssn', 'social security', 'credit card', 
-                        'account number', 'pin', 'banking']
-        for term in personal_info:
-            if term in text_lower:
-                features.append(f"Requests sensitive info: '{term}'")
+        flags.extend(("sensitive_info", f"Requests sensitive info: '{term}'")
+                     for term in PERSONAL_INFO if term in text_lower)
         
         # TACTIC 5: Generic greeting (real companies use your name)
-        if re.search(r'dear (customer|user|member)', text_lower):
-            features.append("Generic greeting (no name)")
+        if _GENERIC_GREET_RE.search(text_lower):
+            flags.append(("generic_greeting", "Generic greeting (no name)"))
         
         # TACTIC 6: Common typos (scammers are sloppy)
-        misspellings = ['recieve', 'seperate', 'occured', 'privilage']
-        for word in misspellings:
-            if word in text_lower:
-                features.append(f"Possible typo: '{word}'")
+        flags.extend(("typo", f"Possible typo: '{word}'")
+                     for word in MISSPELLINGS if word in text_lower)
         
-        return features
+        return flags
+    
+    def _pattern_count(self, totals: Dict) -> int:
+        """How many full-length states a brain knows (ignoring backoff states)."""
+        return sum(1 for state in totals if len(state) == self.order)
     
     def get_statistics(self) -> Dict:
         """Get training statistics."""
         return {
             "legitimate_emails": self.legitimate_count,
             "phishing_emails": self.phishing_count,
-            "legitimate_patterns": len(self.legitimate_chain),
-            "phishing_patterns": len(self.phishing_chain),
+            "legitimate_patterns": self._pattern_count(self.legit_totals),
+            "phishing_patterns": self._pattern_count(self.phishing_totals),
             "markov_order": self.order
         }
+    
+    # Bumped whenever what the chains store changes (2 = with backoff counts)
+    _MODEL_FORMAT = 2
+    
+    # Everything training produces; the log-prob tables are rebuilt on load
+    _SAVED_FIELDS = ('order', '_vocab', 'legitimate_chain', 'phishing_chain',
+                     'legit_totals', 'phishing_totals', 'legitimate_count',
+                     'phishing_count', 'trained')
+    
+    def save(self, path: str):
+        """
+        Save the trained model to a file, so later runs can load() it
+        instead of training all over again.
+        """
+        state = {field: getattr(self, field) for field in self._SAVED_FIELDS}
+        state['format'] = self._MODEL_FORMAT
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    @classmethod
+    def load(cls, path: str, cache_size: int = 256,
+             hard_threshold: Optional[int] = None) -> 'MarkovEmailDetector':
+        """
+        Load a model written by save().
+        
+        cache_size and hard_threshold aren't part of the saved model, so they
+        are passed in here just like for a new detector.
+        This unpickles the file, so only load models you saved yourself.
+        """
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if not isinstance(state, dict):
+            raise ValueError(f"{path} is not a saved detector model")
+        if state.get('format') != cls._MODEL_FORMAT:
+            raise ValueError(f"{path} was saved by an older version of the detector; "
+                             "delete it and train again")
+        
+        detector = cls(order=state['order'], cache_size=cache_size,
+                       hard_threshold=hard_threshold)
+        for field in cls._SAVED_FIELDS:
+            setattr(detector, field, state[field])
+        detector._finalize()
+        return detector
 
 
 # Sample training data
@@ -391,20 +705,73 @@ TEST_EMAILS = [
 ]
 
 
-def main():
+def print_analysis(result: Dict):
+    """Print one detect() result the way the interactive mode shows it."""
+    print("\n" + "=" * 70)
+    print(f"🔍 ANALYSIS RESULTS")
+    print("=" * 70)
+    print(f"\n{'🚨 PHISHING DETECTED' if result['is_phishing'] else '✅ LEGITIMATE EMAIL'}")
+    print(f"Confidence: {result['confidence']:.1f}%")
+    
+    if result['suspicious_features']:
+        print(f"\nSuspicious Features ({len(result['suspicious_features'])}):")
+        for feature in result['suspicious_features']:
+            print(f"  ⚠️  {feature}")
+    else:
+        print("\n✓ No suspicious features detected")
+    
+    print("\n" + "=" * 70)
+
+
+# Where `--model` keeps the trained demo model between runs: the user's
+# cache directory, never whatever directory the script happens to run in
+DEFAULT_MODEL_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "phishing-email-detector", "model.pkl")
+
+
+def main(argv: Optional[List[str]] = None):
     """Main demonstration of phishing detection."""
+    parser = argparse.ArgumentParser(description="Markov Chain Phishing Email Detector")
+    parser.add_argument(
+        "--model", nargs="?", const=DEFAULT_MODEL_PATH, metavar="PATH",
+        help="reuse the trained model saved at PATH (default: %(const)s), "
+             "training and saving it there first if it doesn't exist yet. "
+             "Loading unpickles the file, so only use a model you saved yourself.")
+    args = parser.parse_args(argv)
+    
     print("=" * 70)
     print("Markov Chain Phishing Email Detector")
     print("=" * 70)
     print()
     
-    # Initialize and train detector
-    print("Training detector...\n")
-    detector = MarkovEmailDetector(order=2)
-    
-    # TRAINING PHASE: Teach it what normal vs scam emails look like
-    detector.train_legitimate(LEGITIMATE_EMAILS)
-    detector.train_phishing(PHISHING_EMAILS)
+    detector = None
+    if args.model and os.path.exists(args.model):
+        # Reuse the model trained on an earlier run
+        try:
+            detector = MarkovEmailDetector.load(args.model)
+            print(f"Loaded trained detector from {args.model} (delete it to retrain)")
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, KeyError,
+                AttributeError, ImportError) as e:
+            print(f"Warning: could not load {args.model} ({e}), retraining instead",
+                  file=sys.stderr)
+    
+    if detector is None:
+        # Initialize and train detector
+        print("Training detector...\n")
+        detector = MarkovEmailDetector(order=2)
+        
+        # TRAINING PHASE: Teach it what normal vs scam emails look like
+        detector.train_legitimate(LEGITIMATE_EMAILS)
+        detector.train_phishing(PHISHING_EMAILS)
+        
+        if args.model:
+            try:
+                os.makedirs(os.path.dirname(args.model) or ".", exist_ok=True)
+                detector.save(args.model)
+            except OSError as e:
+                print(f"Warning: could not save model to {args.model} ({e})",
+                      file=sys.stderr)
     
     print()
     stats = detector.get_statistics()
@@ -417,22 +784,33 @@ def main():
     print("=" * 70)
     
     # TESTING PHASE: See if it can correctly identify test emails
-    for i, email in enumerate(TEST_EMAILS, 1):
-        print(f"\n--- Test Email #{i} ---")
-        print(email[:100] + "..." if len(email) > 100 else email)
-        print("\n" + "-" * 70)
-        
-        result = detector.detect(email)
-        
-        print(f"VERDICT: {result['verdict']}")
-        print(f"Confidence: {result['confidence']:.1f}%")
-        print(f"Legitimate Score: {result['legitimate_score']:.2f}")
-        print(f"Phishing Score: {result['phishing_score']:.2f}")
+    # (the report is collected and written in one go, not a print per line)
+    out = []
+    results = detector.detect_batch(TEST_EMAILS)
+    for i, (email, result) in enumerate(zip(TEST_EMAILS, results), 1):
+        out.append(f"\n--- Test Email #{i} ---")
+        out.append(email[:100] + "..." if len(email) > 100 else email)
+        out.append("\n" + "-" * 70)
+        
+        out.append(f"VERDICT: {result['verdict']}")
+        out.append(f"Confidence: {result['confidence']:.1f}%")
+        if result['legitimate_score'] is None:
+            out.append("Markov scores skipped: red flags alone were conclusive")
+        else:
+            out.append(f"Legitimate Score: {result['legitimate_score']:.2f}")
+            out.append(f"Phishing Score: {result['phishing_score']:.2f}")
         
         if result['suspicious_features']:
-            print("\nSuspicious Features Detected:")
-            for feature in result['suspicious_features']:
-                print(f"  ⚠️  {feature}")
+            out.append("\nSuspicious Features Detected:")
+            out.extend(f"  ⚠️  {feature}" for feature in result['suspicious_features'])
+    sys.stdout.write("\n".join(out) + "\n")
+    
+    # Piped input (scripts, tests): read the whole email in one go
+    if not sys.stdin.isatty():
+        email = sys.stdin.read()
+        if email.strip():
+            print_analysis(detector.detect(email))
+        return
     
     # Interactive mode
     print("\n" + "=" * 70)
@@ -442,39 +820,24 @@ def main():
     while True:
         try:
             print("\nPaste email text (press Enter twice when done):")
-            lines = []
+            buf = io.StringIO()
             while True:
                 line = input()
                 if line:
-                    lines.append(line)
+                    buf.write(line + '\n')
                 else:
-                    if lines:
+                    if buf.tell():
                         break
             
-            if not lines:
-                continue
+            email = buf.getvalue()[:-1]  # Drop the last line's newline
             
-            email = '\n'.join(lines)
+            if not email:
+                continue
             
             if email.lower() == 'quit':
                 break
             
-            result = detector.detect(email)
-            
-            print("\n" + "=" * 70)
-            print(f"🔍 ANALYSIS RESULTS")
-            print("=" * 70)
-            print(f"\n{'🚨 PHISHING DETECTED' if result['is_phishing'] else '✅ LEGITIMATE EMAIL'}")
-            print(f"Confidence: {result['confidence']:.1f}%")
-            
-            if result['suspicious_features']:
-                print(f"\nSuspicious Features ({len(result['suspicious_features'])}):")
-                for feature in result['suspicious_features']:
-                    print(f"  ⚠️  {feature}")
-            else:
-                print("\n✓ No suspicious features detected")
-            
-            print("\n" + "=" * 70)
+            print_analysis(detector.detect(email))
         
         except KeyboardInterrupt:
             print("\n\nGoodbye!")